@@ -1,13 +1,23 @@
-from flask import Flask
-from flask_socketio import SocketIO
 import os
 
-socketio = SocketIO()
+# Flask and Socket.IO are only imported when the web app is used, so the
+# headless entry points (worker.py, batch.py) start without them
+def __getattr__(name):
+    if name == 'socketio':
+        from flask_socketio import SocketIO
+        globals()['socketio'] = SocketIO()
+        return globals()['socketio']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def create_app():
+    from flask import Flask
+    from app import socketio
+    
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
     app.config['RESULTS_DIR'] = os.path.join(app.root_path, 'results')
+    # Shared SQLite queue file; when set, scans are run by worker.py processes
+    app.config['JOB_QUEUE'] = os.environ.get('SUBARG_QUEUE')
     
     # Ensure results directory exists
     os.makedirs(app.config['RESULTS_DIR'], exist_ok=True)
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, Optional, TextIO
+
+
+class JSONLWriter:
+    """Writes one JSON object per line and flushes, safe to share between threads.
+
+    ``closed`` is set once the reader goes away; scans check it to stop early.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.closed = threading.Event()
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        line = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            if self.closed.is_set():
+                raise BrokenPipeError('output closed')
+            try:
+                self.stream.write(line + '\n')
+                self.stream.flush()
+            except BrokenPipeError:
+                self.closed.set()
+                raise
+
+
+def read_targets(stream: Iterable[str]) -> Iterator[str]:
+    seen = set()
+    for line in stream:
+        target = line.split('#', 1)[0].strip().lower()
+        if target and target not in seen:
+            seen.add(target)
+            yield target
+
+
+def scan_target(subarg, target: str, writer: JSONLWriter, resolve: bool = True,
+                probe: bool = True, report: bool = False):
+    """Enumerate one target, streaming host, resolution and probe records.
+
+    A failing tool or stage becomes an ``error`` record and the target
+    carries on with what it has; a closed output stops the scan.
+    """
+    from .subarg import parse_dnsx_line
+
+    def error(source, e):
+        writer.write({'type': 'error', 'target': target, 'source': source, 'error': str(e)})
+
+    found = set()
+
+    for tool in subarg.enumeration_tools():
+        if writer.closed.is_set():
+            return
+        try:
+            results = subarg.apply_scope(subarg.filter_dns_records(subarg.run_tool(tool, target), target))
+        except BrokenPipeError:
+            raise
+        except Exception as e:
+            error(tool, e)
+            continue
+
+        for host in results:
+            if host not in found:
+                found.add(host)
+                writer.write({'type': 'host', 'target': target, 'host': host, 'source': tool})
+
+    resolved = []
+    if resolve and found and not writer.closed.is_set():
+        try:
+            resolved = subarg.resolve_subdomains(found)
+        except BrokenPipeError:
+            raise
+        except Exception as e:
+            error('resolve', e)
+
+        for line in resolved:
+            host, record_type, ips = parse_dnsx_line(line)
+            if not host:
+                continue
+            writer.write({
+                'type': 'resolution',
+                'target': target,
+                'host': host,
+                'record_type': record_type,
+                'ips': ips
+            })
+
+    # CIDR scope rules drop hosts that resolved outside the allowed ranges
+    # (or did not resolve at all) before anything is probed
+    found = subarg.apply_ip_scope(found, resolved)
+
+    live, httprobe_used = [], False
+    if probe and found and not writer.closed.is_set():
+        try:
+            live, httprobe_used = subarg.probe_http(found, resolved)
+        except BrokenPipeError:
+            raise
+        except Exception as e:
+            error('probe', e)
+
+        for line in live:
+            url, _, info = line.partition(' ')
+            writer.write({
+                'type': 'probe',
+                'target': target,
+                'url': url,
+                'info': info.strip() or None,
+                'source': 'httprobe' if httprobe_used else 'httpx'
+            })
+
+    if writer.closed.is_set():
+        return
+
+    summary = {'type': 'done', 'target': target, 'hosts': len(found),
+               'resolved': len(resolved), 'live': len(live)}
+    if report:
+        try:
+            summary['output_file'] = subarg.write_report(target, found, resolved, live, httprobe_used)
+        except Exception as e:
+            error('report', e)
+    writer.write(summary)
+
+
+def run_target(subarg, target: str, writer: JSONLWriter, **options):
+    """scan_target that turns unexpected failures into an error record"""
+    try:
+        scan_target(subarg, target, writer, **options)
+    except BrokenPipeError:
+        raise
+    except Exception as e:
+        writer.write({'type': 'error', 'target': target, 'source': None, 'error': str(e)})
+
+
+def run_targets(subarg, targets: Iterable[str], writer: JSONLWriter, concurrency: int = 1, **options):
+    """Scan targets in order or with a bounded thread pool, stopping when output closes"""
+    if concurrency <= 1:
+        for target in targets:
+            if writer.closed.is_set():
+                break
+            run_target(subarg, target, writer, **options)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    pending = set()
+    try:
+        for target in targets:
+            # Keep only a small backlog so a closed output stops new work quickly
+            while len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            if writer.closed.is_set():
+                break
+            pending.add(pool.submit(run_target, subarg, target, writer, **options))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+    finally:
+        # Running scans notice writer.closed at their next stage; queued ones are dropped
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Headless SubARG batch scan, streaming JSON lines to stdout'
+    )
+    parser.add_argument('targets', nargs='?', default='-',
+                        help='File with one target domain per line (default: stdin)')
+    parser.add_argument('--scope', help='Scope file of include/exclude entries')
+    parser.add_argument('-c', '--concurrency', type=int, default=1,
+                        help='Number of targets scanned in parallel')
+    parser.add_argument('--no-resolve', action='store_true', help='Skip dnsx resolution')
+    parser.add_argument('--no-probe', action='store_true', help='Skip HTTP probing')
+    parser.add_argument('--report', choices=['txt', 'json', 'csv', 'html'],
+                        help='Also write a report per target in this format')
+    args = parser.parse_args(argv)
+
+    # Imported here so --help stays instant
+    from .subarg import SubARG
+
+    writer = JSONLWriter(sys.stdout)
+
+    # The pipeline reports progress with print(); keep stdout for records only
+    with contextlib.redirect_stdout(sys.stderr):
+        subarg = SubARG()
+        if args.scope:
+            subarg.set_scope_file(args.scope)
+        if args.report:
+            subarg.set_output_format(args.report)
+        subarg.tool_paths  # detect tools once, before any worker threads start
+
+        stream = sys.stdin if args.targets == '-' else open(args.targets, 'r')
+        try:
+            run_targets(subarg, read_targets(stream), writer, args.concurrency,
+                        resolve=not args.no_resolve, probe=not args.no_probe,
+                        report=bool(args.report))
+        except BrokenPipeError:
+            # Downstream consumer went away (e.g. `| head`); silence the
+            # final flush at interpreter exit as well
+            try:
+                os.dup2(os.open(os.devnull, os.O_WRONLY), writer.stream.fileno())
+            except (AttributeError, OSError, ValueError):
+                pass
+            return 0
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+    return 0
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+ENUMERATE = 'enumerate'
+FINALIZE = 'finalize'
+
+# Tools every scan is split into; a worker without a tool simply returns nothing for it
+ENUMERATION_TOOLS = ['subfinder', 'assetfinder', 'sublist3r', 'amass', 'ffuf', 'crt.sh']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id TEXT PRIMARY KEY,
+    options TEXT NOT NULL DEFAULT '{}',
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    target TEXT NOT NULL,
+    tool TEXT,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_scan ON jobs (scan_id, target, stage, status);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SQLiteJobQueue:
+    """Scan job queue shared between the web app and workers through one SQLite file.
+
+    A scan is split into one ``enumerate`` job per target and tool. When the
+    last enumerate job of a target completes, a ``finalize`` job (filtering,
+    resolution, probing and the report) is queued with the merged results.
+    Scan-wide options (format, filename, scope) are stored once per scan in
+    ``scans`` rather than in every job.
+    Workers report progress as rows in ``events``, which the web app relays
+    to Socket.IO. Anything with the same methods can stand in for this class.
+
+    The default rollback journal is kept on purpose: WAL mode needs shared
+    memory and does not work when the file lives on a network share.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._connect()
+        return _ImmediateTransaction(conn)
+
+    def submit_scan(self, scan_id: str, targets: List[str], options: Optional[Dict] = None,
+                    tools: Optional[List[str]] = None) -> int:
+        """Queue the enumerate jobs of a scan and return how many were queued"""
+        now = time.time()
+        rows = [
+            (scan_id, ENUMERATE, target, tool, '{}', now, now)
+            for target in targets
+            for tool in (tools or ENUMERATION_TOOLS)
+        ]
+
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scans (scan_id, options, created) VALUES (?, ?, ?)",
+                (scan_id, json.dumps(options or {}), now)
+            )
+            conn.executemany(
+                "INSERT INTO jobs (scan_id, stage, target, tool, payload, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def scan_options(self, scan_id: str) -> Dict:
+        """Options the scan was submitted with"""
+        row = self._connect().execute(
+            "SELECT options FROM scans WHERE scan_id = ?", (scan_id,)
+        ).fetchone()
+        return json.loads(row['options']) if row else {}
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """Atomically take the oldest queued job, finalize jobs first"""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' "
+                "ORDER BY stage = ? DESC, id LIMIT 1",
+                (FINALIZE,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, updated = ? WHERE id = ?",
+                (worker_id, time.time(), row['id'])
+            )
+
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['status'] = 'running'
+        job['worker'] = worker_id
+        return job
+
+    def complete(self, job: Dict, result) -> Optional[int]:
+        """Store a job result; returns the id of a finalize job if this completed a target"""
+        finalize_id = None
+
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job['id'], job['worker'])
+            )
+            if cursor.rowcount == 0:
+                # Requeued after a missed heartbeat; the new owner reports it
+                return None
+
+            if job['stage'] == ENUMERATE:
+                pending = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE scan_id = ? AND target = ? AND stage = ? "
+                    "AND status IN ('queued', 'running')",
+                    (job['scan_id'], job['target'], ENUMERATE)
+                ).fetchone()[0]
+                finalized = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE scan_id = ? AND target = ? AND stage = ?",
+                    (job['scan_id'], job['target'], FINALIZE)
+                ).fetchone()[0]
+
+                if pending == 0 and finalized == 0:
+                    subdomains = set()
+                    for (stored,) in conn.execute(
+                        "SELECT result FROM jobs WHERE scan_id = ? AND target = ? AND stage = ? "
+                        "AND status = 'done'",
+                        (job['scan_id'], job['target'], ENUMERATE)
+                    ):
+                        subdomains.update(json.loads(stored) or [])
+
+                    payload = {'subdomains': sorted(subdomains)}
+                    now = time.time()
+                    finalize_id = conn.execute(
+                        "INSERT INTO jobs (scan_id, stage, target, payload, created, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (job['scan_id'], FINALIZE, job['target'], json.dumps(payload), now, now)
+                    ).lastrowid
+
+        return finalize_id
+
+    def fail(self, job: Dict, error: str) -> Optional[int]:
+        """Mark a job failed; a failed enumerate job still lets its target finalize"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET error = ?, updated = ?, "
+                "status = CASE WHEN stage = ? THEN status ELSE 'failed' END "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (error, time.time(), ENUMERATE, job['id'], job['worker'])
+            )
+            if cursor.rowcount == 0:
+                return None
+        if job['stage'] == ENUMERATE:
+            return self.complete(job, [])
+        return None
+
+    def touch(self, job: Dict) -> bool:
+        """Heartbeat for a running job; False once the job was taken away from this worker"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET updated = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), job['id'], job['worker'])
+            )
+        return cursor.rowcount == 1
+
+    def requeue_stale(self, older_than: float) -> int:
+        """Put running jobs back in the queue when their worker stopped sending heartbeats"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, updated = ? "
+                "WHERE status = 'running' AND updated < ?",
+                (time.time(), time.time() - older_than)
+            )
+        return cursor.rowcount
+
+    def scan_progress(self, scan_id: str) -> Dict[str, int]:
+        """Job counts of a scan by status, plus the expected total"""
+        conn = self._connect()
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        for row in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM jobs WHERE scan_id = ? GROUP BY status", (scan_id,)
+        ):
+            counts[row['status']] = row['n']
+
+        targets = conn.execute(
+            "SELECT COUNT(DISTINCT target) FROM jobs WHERE scan_id = ?", (scan_id,)
+        ).fetchone()[0]
+        finalized = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE scan_id = ? AND stage = ?", (scan_id, FINALIZE)
+        ).fetchone()[0]
+        # finalize jobs that are not queued yet still count towards the total
+        counts['total'] = sum(counts.values()) + targets - finalized
+        counts['targets'] = targets
+        return counts
+
+    def finalize_results(self, scan_id: str) -> List[Dict]:
+        conn = self._connect()
+        return [
+            json.loads(row['result'])
+            for row in conn.execute(
+                "SELECT result FROM jobs WHERE scan_id = ? AND stage = ? AND status = 'done'",
+                (scan_id, FINALIZE)
+            )
+        ]
+
+    def forget_scan(self, scan_id: str):
+        """Drop a finished scan's jobs and options once its reports are stored"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE scan_id = ?", (scan_id,))
+            conn.execute("DELETE FROM scans WHERE scan_id = ?", (scan_id,))
+
+    def push_events(self, scan_id: str, events: List[tuple]):
+        """Record ``(event, data)`` pairs for the web app to relay"""
+        if not events:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO events (scan_id, event, data) VALUES (?, ?, ?)",
+                [(scan_id, event, json.dumps(data)) for event, data in events]
+            )
+
+    def pop_events(self, limit: int = 500) -> List[Dict]:
+        """Remove and return the oldest pending events"""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, scan_id, event, data FROM events ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            if rows:
+                conn.execute("DELETE FROM events WHERE id <= ?", (rows[-1]['id'],))
+
+        return [
+            {'scan_id': row['scan_id'], 'event': row['event'], 'data': json.loads(row['data'])}
+            for row in rows
+        ]
+
+
+class _ImmediateTransaction:
+    """``BEGIN IMMEDIATE`` so concurrent workers serialize on the write lock"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
@@ -1,11 +1,16 @@
-from flask import Blueprint, render_template, request, jsonify, send_file, send_from_directory
+from flask import Blueprint, render_template, request, jsonify, send_file, send_from_directory, current_app, abort
+from werkzeug.utils import safe_join
 from flask_socketio import emit
 import os
 import json
 import uuid
 from datetime import datetime
 from .subarg import SubARG  # CHANGED: Use relative import
+from .scope import Scope
+from .results_index import get_results_index
+from .jobqueue import SQLiteJobQueue
 import threading
+import time
 from app import socketio
 
 main = Blueprint('main', __name__)
@@ -13,6 +18,15 @@ main = Blueprint('main', __name__)
 # Store active scans
 active_scans = {}
 
+# Shared job queue for worker mode (see worker.py)
+job_queue = None
+relay_thread = None
+relay_lock = threading.Lock()
+
+# Running jobs without a worker heartbeat for this long are assumed lost
+# with their worker (workers send one every HEARTBEAT_SECONDS)
+STALE_JOB_SECONDS = 300
+
 @main.route('/')
 def index():
     return render_template('index.html')
@@ -26,6 +40,7 @@ def start_scan():
     target_list = data.get('target_list')
     output_format = data.get('output_format', 'txt')
     custom_filename = data.get('filename')
+    scope_lines = data.get('scope')  # scope file contents, one entry per line
     
     # Create scan job
     scan_info = {
@@ -41,20 +56,32 @@ def start_scan():
     
     active_scans[scan_id] = scan_info
     
+    results_index = get_results_index(current_app.config['RESULTS_DIR'])
+    
+    # Hand the scan to remote workers when a shared queue is configured
+    queue = get_job_queue()
+    if queue:
+        submit_distributed_scan(queue, results_index, scan_id, target, target_list,
+                                output_format, custom_filename, scope_lines)
+        return jsonify({'scan_id': scan_id, 'message': 'Scan queued'})
+    
     # Start scan in background
-    thread = threading.Thread(target=run_scan, args=(scan_id, target, target_list, output_format, custom_filename))
+    thread = threading.Thread(target=run_scan, args=(scan_id, target, target_list, output_format,
+                                                     custom_filename, scope_lines, results_index))
     thread.daemon = True
     thread.start()
     
     return jsonify({'scan_id': scan_id, 'message': 'Scan started'})
 
-def run_scan(scan_id, target, target_list, output_format, custom_filename):
+def run_scan(scan_id, target, target_list, output_format, custom_filename, scope_lines=None, results_index=None):
     try:
         active_scans[scan_id]['status'] = 'running'
         socketio.emit('scan_update', {'scan_id': scan_id, 'status': 'running', 'progress': 0})
         
         # Initialize SubARG
         subarg = SubARG()
+        if results_index:
+            subarg.results_dir = results_index.results_dir
         
         # Set parameters
         if target_list:
@@ -65,6 +92,10 @@ def run_scan(scan_id, target, target_list, output_format, custom_filename):
         subarg.set_output_format(output_format)
         if custom_filename:
             subarg.set_output_file(custom_filename)
+        if scope_lines:
+            if isinstance(scope_lines, str):
+                scope_lines = scope_lines.splitlines()
+            subarg.set_scope(Scope.from_lines(scope_lines))
         
         # Run scan with progress callbacks
         def progress_callback(tool, percentage):
@@ -85,6 +116,8 @@ def run_scan(scan_id, target, target_list, output_format, custom_filename):
             })
         
         results = subarg.run(progress_callback=progress_callback, result_callback=result_callback)
+        if results_index and results.get('output_file'):
+            results_index.record(results['output_file'])
         
         active_scans[scan_id]['status'] = 'completed'
         active_scans[scan_id]['end_time'] = datetime.now().isoformat()
@@ -107,6 +140,123 @@ def run_scan(scan_id, target, target_list, output_format, custom_filename):
             'status': 'failed'
         })
 
+def get_job_queue():
+    global job_queue
+    path = current_app.config.get('JOB_QUEUE')
+    if not path:
+        return None
+    if job_queue is None:
+        job_queue = SQLiteJobQueue(path)
+    return job_queue
+
+def submit_distributed_scan(queue, results_index, scan_id, target, target_list,
+                            output_format, custom_filename, scope_lines):
+    if target_list:
+        targets = [line.strip() for line in target_list.splitlines() if line.strip()]
+    else:
+        targets = [target]
+    
+    queue.submit_scan(scan_id, targets, {
+        'output_format': output_format,
+        'filename': custom_filename,
+        'multiple_targets': len(targets) > 1,
+        'scope': scope_lines
+    })  # stored once per scan, not per job
+    
+    active_scans[scan_id].update({'status': 'running', 'distributed': True, 'targets': targets})
+    socketio.emit('scan_update', {'scan_id': scan_id, 'status': 'running', 'progress': 0})
+    
+    global relay_thread
+    with relay_lock:
+        if relay_thread is None:
+            relay_thread = threading.Thread(target=relay_worker_events, args=(queue, results_index))
+            relay_thread.daemon = True
+            relay_thread.start()
+
+def relay_worker_events(queue, results_index):
+    """Forward worker progress from the shared queue to Socket.IO clients"""
+    last_requeue = 0
+    
+    while True:
+        try:
+            events = queue.pop_events()
+            touched = set()
+            
+            for event in events:
+                scan_id = event['scan_id']
+                scan = active_scans.get(scan_id)
+                if scan is None:
+                    continue
+                
+                data = event['data']
+                if event['event'] == 'new_result':
+                    scan['results'].append({'subdomain': data['subdomain'], 'tool': data['tool']})
+                    socketio.emit('new_result', {
+                        'scan_id': scan_id,
+                        'subdomain': data['subdomain'],
+                        'tool': data['tool']
+                    })
+                else:
+                    scan['current_tool'] = data.get('current_tool')
+                touched.add(scan_id)
+            
+            for scan_id, scan in list(active_scans.items()):
+                if scan.get('distributed') and scan['status'] == 'running':
+                    update_distributed_scan(queue, results_index, scan_id, scan, scan_id in touched)
+            
+            if time.time() - last_requeue > 60:
+                queue.requeue_stale(STALE_JOB_SECONDS)
+                last_requeue = time.time()
+        except Exception as e:
+            print(f"Error relaying worker events: {e}")
+            events = []
+        
+        if not events:
+            time.sleep(0.5)
+
+def update_distributed_scan(queue, results_index, scan_id, scan, touched):
+    counts = queue.scan_progress(scan_id)
+    finished = counts['done'] + counts['failed']
+    progress = int(finished / counts['total'] * 100) if counts['total'] else 0
+    
+    if counts['queued'] or counts['running'] or finished < counts['total']:
+        if touched or progress != scan['progress']:
+            scan['progress'] = progress
+            socketio.emit('scan_update', {
+                'scan_id': scan_id,
+                'status': 'running',
+                'progress': progress,
+                'current_tool': scan.get('current_tool')
+            })
+        return
+    
+    reports = queue.finalize_results(scan_id)
+    for report in reports:
+        if report.get('report') is not None:
+            report['output_file'] = results_index.store_report(
+                report.get('output_file'), report.pop('report'), report.get('meta'))
+    queue.forget_scan(scan_id)
+    
+    scan['end_time'] = datetime.now().isoformat()
+    if not reports:
+        scan['status'] = 'failed'
+        scan['error'] = 'All workers failed to finalize the scan'
+        socketio.emit('scan_error', {'scan_id': scan_id, 'error': scan['error'], 'status': 'failed'})
+        return
+    
+    scan['status'] = 'completed'
+    scan['progress'] = 100
+    scan['output_file'] = reports[-1].get('output_file')
+    scan['output_files'] = [report.get('output_file') for report in reports]
+    scan['total_subdomains'] = sum(report.get('total', 0) for report in reports)
+    
+    socketio.emit('scan_complete', {
+        'scan_id': scan_id,
+        'status': 'completed',
+        'output_file': scan['output_file'],
+        'total_subdomains': scan['total_subdomains']
+    })
+
 @main.route('/api/scan/<scan_id>')
 def get_scan_status(scan_id):
     if scan_id in active_scans:
@@ -119,26 +269,40 @@ def get_all_scans():
 
 @main.route('/api/results')
 def get_recent_results():
-    results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
-    results = []
-    
-    for filename in os.listdir(results_dir)[-10:]:  # Get last 10 results
-        filepath = os.path.join(results_dir, filename)
-        if os.path.isfile(filepath):
-            stats = os.stat(filepath)
-            results.append({
-                'filename': filename,
-                'path': f'/api/download/{filename}',
-                'size': stats.st_size,
-                'created': datetime.fromtimestamp(stats.st_ctime).isoformat()
-            })
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 10, type=int), 100)
+    
+    entries, total = get_results_index(current_app.config['RESULTS_DIR']).listing(page, per_page)
     
-    return jsonify(results)
+    response = jsonify(entries)
+    response.headers['X-Total-Count'] = str(total)
+    response.headers['X-Page'] = str(max(page, 1))
+    response.headers['X-Per-Page'] = str(max(per_page, 1))
+    return response
+
+# Reports smaller than this are not worth compressing
+GZIP_MIN_SIZE = 64 * 1024
 
 @main.route('/api/download/<filename>')
 def download_file(filename):
-    results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
-    return send_from_directory(results_dir, filename, as_attachment=True)
+    results_dir = current_app.config['RESULTS_DIR']
+    filepath = safe_join(results_dir, filename)
+    if filepath is None or not os.path.isfile(filepath):
+        abort(404)
+    
+    # Ranged requests are served from the original file so byte offsets
+    # stay meaningful; full downloads of large reports go out gzipped
+    accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    if accepts_gzip and 'Range' not in request.headers and os.path.getsize(filepath) >= GZIP_MIN_SIZE:
+        gzip_path = get_results_index(results_dir).gzip_path(filename)
+        response = send_file(gzip_path, as_attachment=True, download_name=filename, conditional=True)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+    
+    response = send_from_directory(results_dir, filename, as_attachment=True, conditional=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 @main.route('/api/installed_tools')
 def get_installed_tools():
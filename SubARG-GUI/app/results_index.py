@@ -0,0 +1,238 @@
+import os
+import json
+import gzip
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+META_SUFFIX = '.meta.json'
+CACHE_DIR = '.cache'
+TEMP_MAX_AGE = 3600
+
+
+def meta_path(report_path: str) -> str:
+    """Path of the metadata sidecar written next to a report"""
+    return report_path + META_SUFFIX
+
+
+def write_meta(report_path: str, meta: Dict):
+    with open(meta_path(report_path), 'w') as f:
+        json.dump(meta, f)
+
+    # Overwriting an existing report leaves the directory mtime alone; bump
+    # it so every ResultsIndex on this directory rescans
+    os.utime(os.path.dirname(os.path.abspath(report_path)))
+
+
+class ResultsIndex:
+    """Newest-first index of the report files in a results directory.
+
+    The directory is only rescanned when its mtime changes (write_meta
+    bumps it), and sidecar metadata is only re-read for files whose report
+    or sidecar changed, so listing stays cheap with thousands of accumulated
+    reports. The returned page is re-checked on every listing to catch
+    reports rewritten in place by other writers.
+    """
+
+    def __init__(self, results_dir: str):
+        self.results_dir = results_dir
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._ordered: List[Dict] = []
+        self._dir_mtime: Optional[float] = None
+        # filename -> (report mtime, report size, sidecar mtime) the entry was loaded from
+        self._stamps: Dict[str, Tuple] = {}
+
+    def _is_report(self, name: str) -> bool:
+        return bool(name) and not name.startswith('.') and not name.endswith(META_SUFFIX) and not name.endswith('.gz')
+
+    def _stamp(self, name: str, stat) -> Tuple:
+        try:
+            meta_mtime = os.stat(meta_path(os.path.join(self.results_dir, name))).st_mtime
+        except OSError:
+            meta_mtime = None
+        return (stat.st_mtime, stat.st_size, meta_mtime)
+
+    def _sort(self):
+        self._ordered = sorted(self._entries.values(), key=lambda e: e['mtime'], reverse=True)
+
+    def _load_entry(self, name: str, stat) -> Dict:
+        entry = {
+            'filename': name,
+            'path': f'/api/download/{name}',
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'created': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'format': os.path.splitext(name)[1].lstrip('.') or None,
+            'target': None,
+            'total': None,
+        }
+
+        try:
+            with open(meta_path(os.path.join(self.results_dir, name)), 'r') as f:
+                meta = json.load(f)
+            entry.update({
+                'target': meta.get('domain'),
+                'format': meta.get('format', entry['format']),
+                'total': meta.get('total_subdomains'),
+                'resolved': meta.get('resolved_subdomains'),
+                'live': meta.get('live_subdomains'),
+            })
+        except (OSError, ValueError):
+            pass
+
+        self._stamps[name] = self._stamp(name, stat)
+        return entry
+
+    def refresh(self, force: bool = False):
+        try:
+            dir_mtime = os.stat(self.results_dir).st_mtime
+        except FileNotFoundError:
+            with self._lock:
+                self._entries, self._ordered, self._dir_mtime = {}, [], None
+            return
+
+        with self._lock:
+            if not force and dir_mtime == self._dir_mtime:
+                return
+
+            entries = {}
+            with os.scandir(self.results_dir) as it:
+                for dirent in it:
+                    if not self._is_report(dirent.name) or not dirent.is_file():
+                        continue
+                    stat = dirent.stat()
+                    cached = self._entries.get(dirent.name)
+                    if cached and self._stamps.get(dirent.name) == self._stamp(dirent.name, stat):
+                        entries[dirent.name] = cached
+                    else:
+                        entries[dirent.name] = self._load_entry(dirent.name, stat)
+
+            self._stamps = {name: self._stamps[name] for name in entries}
+            self._entries = entries
+            self._sort()
+            self._dir_mtime = dir_mtime
+
+        self._prune_cache(set(entries))
+
+    def _prune_cache(self, reports: set):
+        """Remove gzip copies of deleted reports and abandoned temp files"""
+        cache_dir = os.path.join(self.results_dir, CACHE_DIR)
+        try:
+            it = os.scandir(cache_dir)
+        except FileNotFoundError:
+            return
+
+        # Temp files younger than this may still be written by another request
+        abandoned_before = time.time() - TEMP_MAX_AGE
+        with it:
+            for dirent in it:
+                try:
+                    if dirent.name.endswith('.tmp'):
+                        if dirent.stat().st_mtime < abandoned_before:
+                            os.remove(dirent.path)
+                    elif dirent.name.endswith('.gz') and dirent.name[:-3] not in reports:
+                        os.remove(dirent.path)
+                except OSError:
+                    pass
+
+    def record(self, filename: str):
+        """Add or update a single report without rescanning the directory"""
+        path = os.path.join(self.results_dir, filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+
+        with self._lock:
+            self._entries[filename] = self._load_entry(filename, stat)
+            self._sort()
+
+    def store_report(self, filename: str, content: str, meta: Optional[Dict] = None) -> Optional[str]:
+        """Write a report produced elsewhere (e.g. by a remote worker) into this directory"""
+        # Plain report names only: no directories, dot-files or sidecars
+        if not filename or filename != os.path.basename(filename) or not self._is_report(filename):
+            return None
+
+        path = os.path.join(self.results_dir, filename)
+        fd, temp = tempfile.mkstemp(dir=self.results_dir, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+        if meta is not None:
+            write_meta(path, meta)
+        self.record(filename)
+        return filename
+
+    def listing(self, page: int = 1, per_page: int = 10) -> Tuple[List[Dict], int]:
+        """Return one page of entries (newest first) and the total count"""
+        self.refresh()
+        page = max(page, 1)
+        per_page = max(per_page, 1)
+        start = (page - 1) * per_page
+
+        with self._lock:
+            changed = False
+            for entry in self._ordered[start:start + per_page]:
+                name = entry['filename']
+                try:
+                    stat = os.stat(os.path.join(self.results_dir, name))
+                except FileNotFoundError:
+                    del self._entries[name]
+                    self._stamps.pop(name, None)
+                    changed = True
+                    continue
+                if self._stamps.get(name) != self._stamp(name, stat):
+                    self._entries[name] = self._load_entry(name, stat)
+                    changed = True
+
+            if changed:
+                self._sort()
+            return list(self._ordered[start:start + per_page]), len(self._ordered)
+
+    def gzip_path(self, filename: str) -> Optional[str]:
+        """Path of a cached gzip copy of a report, created on first use"""
+        source = os.path.join(self.results_dir, filename)
+        if not os.path.isfile(source):
+            return None
+
+        cache_dir = os.path.join(self.results_dir, CACHE_DIR)
+        os.makedirs(cache_dir, exist_ok=True)
+        target = os.path.join(cache_dir, filename + '.gz')
+
+        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source):
+            # Each request builds its own temp file, so simultaneous first
+            # downloads never replace a file another request is still writing
+            fd, temp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as raw, open(source, 'rb') as src:
+                    with gzip.GzipFile(filename=filename, fileobj=raw, mode='wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                os.replace(temp, target)
+            except BaseException:
+                if os.path.exists(temp):
+                    os.remove(temp)
+                raise
+
+        return target
+
+
+_indexes: Dict[str, ResultsIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_results_index(results_dir: str) -> ResultsIndex:
+    results_dir = os.path.abspath(results_dir)
+    with _indexes_lock:
+        if results_dir not in _indexes:
+            _indexes[results_dir] = ResultsIndex(results_dir)
+        return _indexes[results_dir]
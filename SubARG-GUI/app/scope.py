@@ -0,0 +1,204 @@
+import os
+import ipaddress
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _LabelNode:
+    __slots__ = ('children', 'exact', 'wildcard')
+
+    def __init__(self):
+        self.children = {}
+        self.exact = False      # the name ending at this node matches
+        self.wildcard = False   # any name strictly below this node matches
+
+
+class _LabelTrie:
+    """Domain patterns stored by reversed labels (com -> example -> www)"""
+
+    def __init__(self):
+        self.root = _LabelNode()
+        self.size = 0
+
+    def add(self, labels: List[str], wildcard: bool):
+        node = self.root
+        for label in reversed(labels):
+            node = node.children.setdefault(label, _LabelNode())
+        if wildcard:
+            node.wildcard = True
+        else:
+            node.exact = True
+        self.size += 1
+
+    def match(self, labels: List[str]) -> bool:
+        node = self.root
+        remaining = len(labels)
+        for label in reversed(labels):
+            node = node.children.get(label)
+            if node is None:
+                return False
+            remaining -= 1
+            if node.wildcard and remaining > 0:
+                return True
+        return node.exact
+
+
+class _CidrTable:
+    """Networks grouped by prefix length, one hash lookup per length"""
+
+    def __init__(self):
+        self.tables = {4: {}, 6: {}}
+        self.size = 0
+
+    def add(self, network):
+        by_prefix = self.tables[network.version]
+        by_prefix.setdefault(network.prefixlen, set()).add(int(network.network_address))
+        self.size += 1
+
+    def match(self, address) -> bool:
+        value = int(address)
+        bits = address.max_prefixlen
+        for prefixlen, networks in self.tables[address.version].items():
+            mask = ((1 << prefixlen) - 1) << (bits - prefixlen)
+            if (value & mask) in networks:
+                return True
+        return False
+
+
+def _normalize_name(name: str) -> str:
+    name = name.strip().lower()
+    if '://' in name:
+        name = name.split('://', 1)[1]
+    name = name.split('/', 1)[0]
+    if name.count(':') == 1:
+        name = name.split(':', 1)[0]  # host:port
+    return name.rstrip('.')
+
+
+class Scope:
+    """Include/exclude scope for hostnames and resolved IPs.
+
+    Name entries are either exact hosts (``api.example.com``) or wildcards
+    (``*.example.com``, every name below example.com). IP entries are
+    addresses or CIDR ranges. Exclusions always win. An empty include side
+    means "everything not excluded" for that kind of entry.
+    """
+
+    def __init__(self, include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None):
+        self._include_names = _LabelTrie()
+        self._exclude_names = _LabelTrie()
+        self._include_nets = _CidrTable()
+        self._exclude_nets = _CidrTable()
+
+        for entry in include or []:
+            self.add(entry)
+        for entry in exclude or []:
+            self.add(entry, exclude=True)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> 'Scope':
+        """Build a scope from scope-file lines.
+
+        Blank lines and ``#`` comments are ignored, lines starting with
+        ``!`` or ``-`` are exclusions.
+        """
+        scope = cls()
+        for line in lines:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if line[0] in '!-':
+                scope.add(line[1:], exclude=True)
+            else:
+                scope.add(line)
+        return scope
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Scope':
+        with open(path, 'r') as f:
+            return cls.from_lines(f)
+
+    def add(self, entry: str, exclude: bool = False):
+        entry = entry.strip()
+        if not entry:
+            return
+
+        try:
+            network = ipaddress.ip_network(entry, strict=False)
+        except ValueError:
+            network = None
+
+        if network is not None:
+            (self._exclude_nets if exclude else self._include_nets).add(network)
+            return
+
+        name = _normalize_name(entry)
+        wildcard = False
+        if name.startswith('*.'):
+            name = name[2:]
+            wildcard = True
+        if not name:
+            return
+        (self._exclude_names if exclude else self._include_names).add(name.split('.'), wildcard)
+
+    def __bool__(self):
+        return bool(self._include_names.size or self._exclude_names.size or
+                    self._include_nets.size or self._exclude_nets.size)
+
+    def host_in_scope(self, host: str) -> bool:
+        labels = _normalize_name(host).split('.')
+        if self._exclude_names.size and self._exclude_names.match(labels):
+            return False
+        if self._include_names.size:
+            return self._include_names.match(labels)
+        return True
+
+    def ip_in_scope(self, ip: str) -> bool:
+        try:
+            address = ipaddress.ip_address(ip.strip())
+        except ValueError:
+            return False
+        if self._exclude_nets.size and self._exclude_nets.match(address):
+            return False
+        if self._include_nets.size:
+            return self._include_nets.match(address)
+        return True
+
+    @property
+    def has_ip_rules(self) -> bool:
+        return bool(self._include_nets.size or self._exclude_nets.size)
+
+    def record_in_scope(self, host: str, ips: Iterable[str]) -> bool:
+        """A resolved record is in scope when its name and all of its addresses are.
+
+        Addresses are only checked when the scope has CIDR rules.
+        """
+        if not self.host_in_scope(host):
+            return False
+        if not self.has_ip_rules:
+            return True
+        return all(self.ip_in_scope(ip) for ip in ips)
+
+    def filter_hosts(self, hosts: Iterable[str]) -> List[str]:
+        return [host for host in hosts if self.host_in_scope(host)]
+
+
+_scope_cache: Dict[str, Tuple[float, Scope]] = {}
+_scope_cache_lock = threading.Lock()
+
+
+def load_scope(path: str) -> Scope:
+    """Load a scope file, reusing the parsed scope while the file is unchanged"""
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+
+    with _scope_cache_lock:
+        cached = _scope_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    scope = Scope.from_file(path)
+    with _scope_cache_lock:
+        _scope_cache[path] = (mtime, scope)
+    return scope
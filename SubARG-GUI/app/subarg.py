@@ -1,11 +1,34 @@
 import subprocess
 import os
+import importlib.util
 import json
 import time
 import re  # Added for regex pattern matching
 from typing import List, Dict, Callable, Optional
 import tempfile
-import requests
+import ipaddress
+from urllib.parse import urlparse
+from .scope import Scope, load_scope
+from .results_index import write_meta
+
+def parse_dnsx_line(line: str):
+    """Split a dnsx ``-resp`` line (``host [A] [1.2.3.4]`` or ``host [1.2.3.4]``)
+    into the host, the record type (or None) and the IP addresses"""
+    parts = line.split()
+    if not parts:
+        return None, None, []
+    
+    record_type = None
+    ips = []
+    for part in parts[1:]:
+        value = part.strip('[]')
+        try:
+            ips.append(str(ipaddress.ip_address(value)))
+        except ValueError:
+            if value.isalpha() and record_type is None:
+                record_type = value.upper()
+    
+    return parts[0], record_type, ips
 
 class SubARG:
     def __init__(self):
@@ -13,14 +36,21 @@ class SubARG:
         self.target_list = None
         self.output_format = 'txt'
         self.output_file = None
-        self.results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results')
+        self.scope = None
+        self.results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
         
         # Ensure results directory exists
         os.makedirs(self.results_dir, exist_ok=True)
         
-        # Tool paths (will be auto-detected)
-        self.tool_paths = {}
-        self.detect_tools()
+        # Tool paths (auto-detected on first use)
+        self._tool_paths = None
+    
+    @property
+    def tool_paths(self) -> Dict[str, Optional[str]]:
+        if self._tool_paths is None:
+            self._tool_paths = {}
+            self.detect_tools()
+        return self._tool_paths
     
     def detect_tools(self):
         """Detect available tools and their paths"""
@@ -45,13 +75,10 @@ class SubARG:
             tool_found = False
             
             if tool == 'sublist3r':
-                # Check for sublist3r Python module
-                try:
-                    import sublist3r
+                # Check for sublist3r Python module without importing it
+                if importlib.util.find_spec('sublist3r') is not None:
                     self.tool_paths[tool] = 'python'
                     tool_found = True
-                except ImportError:
-                    pass
             
             # Check all possible paths
             for path_prefix in possible_paths:
@@ -173,6 +200,61 @@ class SubARG:
     def set_output_file(self, filename: str):
         self.output_file = filename
     
+    def set_scope(self, scope: Optional[Scope]):
+        self.scope = scope
+    
+    def set_scope_file(self, path: str):
+        self.scope = load_scope(path)
+    
+    def apply_scope(self, subdomains: List[str]) -> List[str]:
+        """Drop subdomains that fall outside the configured scope"""
+        if not self.scope:
+            return subdomains
+        return self.scope.filter_hosts(subdomains)
+    
+    def scope_resolved(self, resolved: List[str]) -> List[str]:
+        """Drop dnsx lines of hosts whose name or any address is out of scope"""
+        if not self.scope:
+            return resolved
+        records = []
+        rejected = set()
+        for line in resolved:
+            host, _, ips = parse_dnsx_line(line)
+            if not host:
+                continue
+            records.append((host, line))
+            if not self.scope.record_in_scope(host, ips):
+                rejected.add(host)
+        return [line for host, line in records if host not in rejected]
+    
+    def apply_ip_scope(self, subdomains, resolved: List[str]) -> set:
+        """With CIDR rules, keep only hosts that resolved to in-scope addresses.
+        
+        Unresolved names cannot be checked against the CIDR rules, so they are
+        dropped rather than probed.
+        """
+        if not self.scope or not self.scope.has_ip_rules:
+            return set(subdomains)
+        resolved_hosts = {parse_dnsx_line(line)[0] for line in resolved}
+        return {sub for sub in subdomains if sub in resolved_hosts}
+    
+    def scope_live(self, live: List[str], hosts=None) -> List[str]:
+        """Drop httpx/httprobe lines whose host is out of scope or not in ``hosts``"""
+        if not self.scope and hosts is None:
+            return live
+        scoped = []
+        for line in live:
+            url = line.split()[0] if line.split() else ''
+            host = urlparse(url).hostname if '://' in url else url
+            if not host:
+                continue
+            if self.scope and not self.scope.host_in_scope(host):
+                continue
+            if hosts is not None and host not in hosts:
+                continue
+            scoped.append(line)
+        return scoped
+    
     def check_installed_tools(self) -> Dict[str, bool]:
         """Check which tools are installed"""
         return {tool: path is not None for tool, path in self.tool_paths.items()}
@@ -222,6 +304,7 @@ class SubARG:
         if tool_name == 'crt.sh':
             # Special handling for crt.sh - always available
             try:
+                import requests
                 response = requests.get(f"https://crt.sh/?q=%25.{target}&output=json", timeout=30)
                 if response.status_code == 200:
                     data = response.json()
@@ -232,6 +315,7 @@ class SubARG:
                                 sub = sub.replace('*.', '').strip()
                                 if sub and target in sub:
                                     results.append(sub)
+                results = self.apply_scope(results)
             except Exception as e:
                 print(f"Error with crt.sh: {e}")
         
@@ -303,7 +387,7 @@ class SubARG:
                             os.remove(temp_file)
                 
                 # Filter DNS records from results
-                filtered_results = self.filter_dns_records(results, target)
+                filtered_results = self.apply_scope(self.filter_dns_records(results, target))
                 
                 # Process filtered results
                 for result in filtered_results:
@@ -324,16 +408,8 @@ class SubARG:
         
         return results
     
-    def run(self, progress_callback: Optional[Callable] = None, 
-           result_callback: Optional[Callable] = None) -> Dict:
-        """Run complete subdomain enumeration"""
-        all_subdomains = set()
-        target = self.target
-        
-        if progress_callback:
-            progress_callback("Initializing", 0)
-        
-        # Run available tools
+    def enumeration_tools(self) -> List[str]:
+        """Enumeration tools to run on this host, in order"""
         tools_to_run = []
         available_tools = self.check_installed_tools()
         
@@ -345,6 +421,20 @@ class SubARG:
         # Always try crt.sh
         tools_to_run.append('crt.sh')
         
+        return tools_to_run
+    
+    def run(self, progress_callback: Optional[Callable] = None, 
+           result_callback: Optional[Callable] = None) -> Dict:
+        """Run complete subdomain enumeration"""
+        all_subdomains = set()
+        target = self.target
+        
+        if progress_callback:
+            progress_callback("Initializing", 0)
+        
+        # Run available tools
+        tools_to_run = self.enumeration_tools()
+        
         print(f"Running tools: {tools_to_run}")
         
         for i, tool in enumerate(tools_to_run):
@@ -361,19 +451,15 @@ class SubARG:
             except Exception as e:
                 print(f"Error with {tool}: {e}")
         
-        # Filter DNS records from all collected subdomains
-        if progress_callback:
-            progress_callback("Filtering DNS records", 75)
-        
-        filtered_subdomains = self.filter_dns_records(list(all_subdomains), target)
-        all_subdomains = set(filtered_subdomains)
+        return self.finalize(target, all_subdomains, progress_callback)
+    
+    def resolve_subdomains(self, subdomains) -> List[str]:
+        """Resolve subdomains with dnsx, returning in-scope ``host [ip]`` lines"""
+        all_subdomains = set(subdomains)
         
         # Run DNS resolution if dnsx is available
         resolved = []
         if 'dnsx' in self.tool_paths and self.tool_paths['dnsx'] and all_subdomains:
-            if progress_callback:
-                progress_callback("Resolving DNS", 80)
-            
             temp_file = tempfile.mktemp()
             with open(temp_file, 'w') as f:
                 f.write('\n'.join(all_subdomains))
@@ -383,23 +469,34 @@ class SubARG:
                 result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
                 if result.stdout:
                     resolved = [line.strip() for line in result.stdout.split('\n') if line.strip()]
+                    resolved = self.scope_resolved(resolved)
             except:
                 pass
             
             os.remove(temp_file)
         
-        # Run HTTP check with httpx and httprobe fallback
-        if progress_callback:
-            progress_callback("Checking HTTP services", 85)
-        
+        return resolved
+    
+    def probe_http(self, subdomains, resolved: List[str], progress_callback: Optional[Callable] = None):
+        """Find live HTTP services with httpx, falling back to httprobe.
+        
+        Only ``subdomains`` are probed; callers pass the set already narrowed
+        by apply_ip_scope so excluded infrastructure is never contacted.
+        """
+        all_subdomains = set(subdomains)
+        # Probe hostnames, not raw dnsx lines
+        resolved_hosts = sorted({
+            host for host in (parse_dnsx_line(line)[0] for line in resolved)
+            if host in all_subdomains
+        })
         live_subdomains = []
         httprobe_used = False
         
         # First try httpx if available
-        if 'httpx' in self.tool_paths and self.tool_paths['httpx'] and resolved:
+        if 'httpx' in self.tool_paths and self.tool_paths['httpx'] and resolved_hosts:
             temp_file = tempfile.mktemp()
             with open(temp_file, 'w') as f:
-                f.write('\n'.join(resolved))
+                f.write('\n'.join(resolved_hosts))
             
             try:
                 cmd = ['httpx', '-l', temp_file, '-silent', '-title', 
@@ -420,16 +517,17 @@ class SubARG:
             httprobe_used = True
             
             # Use resolved subdomains if available, otherwise use all subdomains
-            targets_to_probe = resolved if resolved else list(all_subdomains)
+            targets_to_probe = resolved_hosts if resolved_hosts else sorted(all_subdomains)
             
             if targets_to_probe:
                 httprobe_results = self.run_httprobe(targets_to_probe)
                 live_subdomains = httprobe_results
         
-        # Save results
-        if progress_callback:
-            progress_callback("Saving results", 95)
-        
+        return self.scope_live(live_subdomains, all_subdomains), httprobe_used
+    
+    def write_report(self, target: str, all_subdomains, resolved: List[str],
+                     live_subdomains: List[str], httprobe_used: bool) -> str:
+        """Write the report in the configured format and return its filename"""
         output_filename = self.output_file or f"subdomains_{target}_{int(time.time())}"
         
         if self.output_format == 'json':
@@ -532,6 +630,49 @@ class SubARG:
                 for sub in sorted(all_subdomains):
                     f.write(f"{sub}\n")
         
+        # Sidecar metadata lets the results listing skip parsing reports
+        write_meta(output_path, {
+            'domain': target,
+            'format': self.output_format if self.output_format in ('json', 'csv', 'html') else 'txt',
+            'timestamp': time.time(),
+            'total_subdomains': len(all_subdomains),
+            'resolved_subdomains': len(resolved),
+            'live_subdomains': len(live_subdomains),
+            'httprobe_used': httprobe_used
+        })
+        
+        return output_filename
+    
+    def finalize(self, target: str, subdomains, progress_callback: Optional[Callable] = None) -> Dict:
+        """Filter, resolve and probe enumerated subdomains, then write the report"""
+        all_subdomains = set(subdomains)
+        
+        # Filter DNS records from all collected subdomains
+        if progress_callback:
+            progress_callback("Filtering DNS records", 75)
+        
+        filtered_subdomains = self.apply_scope(self.filter_dns_records(list(all_subdomains), target))
+        all_subdomains = set(filtered_subdomains)
+        
+        # Run DNS resolution if dnsx is available
+        if progress_callback and self.tool_paths.get('dnsx') and all_subdomains:
+            progress_callback("Resolving DNS", 80)
+        
+        resolved = self.resolve_subdomains(all_subdomains)
+        all_subdomains = self.apply_ip_scope(all_subdomains, resolved)
+        
+        # Run HTTP check with httpx and httprobe fallback
+        if progress_callback:
+            progress_callback("Checking HTTP services", 85)
+        
+        live_subdomains, httprobe_used = self.probe_http(all_subdomains, resolved, progress_callback)
+        
+        # Save results
+        if progress_callback:
+            progress_callback("Saving results", 95)
+        
+        output_filename = self.write_report(target, all_subdomains, resolved, live_subdomains, httprobe_used)
+        
         if progress_callback:
             progress_callback("Complete", 100)
         
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import socket
+import threading
+import traceback
+from typing import Dict, Optional
+
+from .subarg import SubARG
+from .scope import Scope
+from .jobqueue import ENUMERATE, FINALIZE
+from .results_index import meta_path
+
+# Must stay well below the web app's STALE_JOB_SECONDS
+HEARTBEAT_SECONDS = 30
+
+
+class Worker:
+    """Headless process that pulls scan jobs from a shared queue and runs them.
+
+    One SubARG instance (and so one round of tool detection) is reused for
+    every job. Run several workers, on one host or many, to scale a scan out;
+    they only need to share the queue file. Finished reports are sent back
+    through the queue and stored by the web app.
+    """
+
+    def __init__(self, queue, worker_id: Optional[str] = None, results_dir: Optional[str] = None,
+                 poll_interval: float = 1.0):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.subarg = SubARG()
+        if results_dir:
+            self.subarg.results_dir = results_dir
+            os.makedirs(results_dir, exist_ok=True)
+
+        # Options and parsed scope per scan, so large scope lists are
+        # fetched and parsed once per worker rather than once per job
+        self._scans: Dict[str, Dict] = {}
+
+    def _scan_for(self, job: Dict) -> Dict:
+        scan_id = job['scan_id']
+        if scan_id not in self._scans:
+            if len(self._scans) >= 16:
+                self._scans.clear()
+
+            options = self.queue.scan_options(scan_id)
+            lines = options.get('scope')
+            if isinstance(lines, str):
+                lines = lines.splitlines()
+            self._scans[scan_id] = {
+                'options': options,
+                'scope': Scope.from_lines(lines) if lines else None
+            }
+        return self._scans[scan_id]
+
+    def run_enumerate(self, job: Dict):
+        tool, target = job['tool'], job['target']
+        self.queue.push_events(job['scan_id'], [
+            ('scan_update', {'current_tool': f"Running {tool} on {target}", 'worker': self.worker_id})
+        ])
+
+        self.subarg.set_scope(self._scan_for(job)['scope'])
+        results = self.subarg.run_tool(tool, target)
+        results = sorted(set(results))
+
+        self.queue.push_events(job['scan_id'], [
+            ('new_result', {'subdomain': subdomain, 'tool': tool}) for subdomain in results
+        ])
+        return results
+
+    def run_finalize(self, job: Dict):
+        payload = job['payload']
+        target = job['target']
+        self.queue.push_events(job['scan_id'], [
+            ('scan_update', {'current_tool': f"Finalizing {target}", 'worker': self.worker_id})
+        ])
+
+        scan = self._scan_for(job)
+        options = scan['options']
+        self.subarg.set_scope(scan['scope'])
+        self.subarg.set_output_format(options.get('output_format', 'txt'))
+        self.subarg.set_output_file(options.get('filename'))
+        if options.get('filename') and options.get('multiple_targets'):
+            self.subarg.set_output_file(f"{options['filename']}_{target}")
+
+        results = self.subarg.finalize(target, payload.get('subdomains', []))
+        output_file = results.get('output_file')
+        report_path = os.path.join(self.subarg.results_dir, output_file)
+
+        # Push the report back through the queue; the web app writes it into
+        # its own results directory, so workers need no shared filesystem
+        with open(report_path, 'r') as f:
+            report = f.read()
+        try:
+            with open(meta_path(report_path), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+
+        return {
+            'target': target,
+            'output_file': output_file,
+            'total': results.get('total', 0),
+            'report': report,
+            'meta': meta
+        }
+
+    def _heartbeat(self, job: Dict, stop: threading.Event):
+        while not stop.wait(HEARTBEAT_SECONDS):
+            try:
+                if not self.queue.touch(job):
+                    print(f"Worker {self.worker_id}: job {job['id']} was requeued elsewhere")
+                    return
+            except Exception as e:
+                print(f"Worker {self.worker_id}: heartbeat failed: {e}")
+
+    def run_job(self, job: Dict):
+        # Long stages (sublist3r has no timeout, finalize runs three tools)
+        # keep the job marked alive so it is not requeued under us
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop))
+        heartbeat.daemon = True
+        heartbeat.start()
+        try:
+            self._run_job(job)
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def _run_job(self, job: Dict):
+        try:
+            if job['stage'] == ENUMERATE:
+                result = self.run_enumerate(job)
+            elif job['stage'] == FINALIZE:
+                result = self.run_finalize(job)
+            else:
+                raise ValueError(f"Unknown stage {job['stage']}")
+        except Exception as e:
+            traceback.print_exc()
+            self.queue.fail(job, str(e))
+            return
+
+        self.queue.complete(job, result)
+
+    def run_forever(self, max_jobs: Optional[int] = None):
+        print(f"Worker {self.worker_id} waiting for jobs")
+        processed = 0
+
+        while max_jobs is None or processed < max_jobs:
+            job = self.queue.claim(self.worker_id)
+            if job is None:
+                time.sleep(self.poll_interval)
+                continue
+
+            print(f"Worker {self.worker_id}: {job['stage']} {job['target']} {job.get('tool') or ''}")
+            self.run_job(job)
+            processed += 1
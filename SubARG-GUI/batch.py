@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+SubARG GUI - Headless Batch Entry Point
+
+Reads target domains from a file or stdin and streams newline-delimited JSON
+records (host, resolution, probe, done) to stdout, e.g.:
+
+    cat targets.txt | python batch.py --scope scope.txt -c 4 | jq .
+"""
+
+import sys
+
+from app.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
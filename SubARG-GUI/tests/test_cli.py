@@ -0,0 +1,164 @@
+import io
+import json
+import time
+import threading
+
+import pytest
+
+import app.subarg as subarg_module
+from app import cli
+from app.cli import JSONLWriter, read_targets, scan_target, run_targets
+from app.scope import Scope
+from app.subarg import SubARG
+
+
+class StubSubARG:
+    """Stands in for SubARG with canned tool, dnsx and probe output"""
+
+    def __init__(self, fail=(), delay=0.0):
+        self.fail = set(fail)
+        self.delay = delay
+        self.scope = None
+        self.output_format = 'txt'
+        self.tool_paths = {}
+        self.scanned = []
+        self._lock = threading.Lock()
+
+    def set_scope_file(self, path):
+        self.scope = Scope.from_file(path)
+
+    def set_output_format(self, format):
+        self.output_format = format
+
+    def enumeration_tools(self):
+        return ['subfinder', 'crt.sh']
+
+    def run_tool(self, tool, target):
+        with self._lock:
+            if tool == 'subfinder':
+                self.scanned.append(target)
+        time.sleep(self.delay)
+        if tool in self.fail:
+            raise RuntimeError(f'{tool} broke')
+        if tool == 'subfinder':
+            return [f'a.{target}', f'b.{target}', 'unrelated.test']
+        return [f'b.{target}', f'c.{target}']
+
+    # real filtering and scoping logic
+    filter_dns_records = SubARG.filter_dns_records
+    apply_scope = SubARG.apply_scope
+    apply_ip_scope = SubARG.apply_ip_scope
+
+    def resolve_subdomains(self, subdomains):
+        if 'resolve' in self.fail:
+            raise RuntimeError('dnsx broke')
+        return [f'{host} [A] [10.0.0.1]' for host in sorted(subdomains)]
+
+    def probe_http(self, subdomains, resolved):
+        if 'probe' in self.fail:
+            raise RuntimeError('httpx broke')
+        return [f'https://{host} [200] [Title]' for host in sorted(subdomains)][:1], False
+
+    def write_report(self, target, found, resolved, live, httprobe_used):
+        if 'report' in self.fail:
+            raise OSError('disk full')
+        return f'subdomains_{target}.{self.output_format}'
+
+
+def records(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class ClosingStream(io.StringIO):
+    """Accepts ``limit`` lines, then behaves like a pipe whose reader exited"""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def write(self, text):
+        if self.getvalue().count('\n') >= self.limit:
+            raise BrokenPipeError
+        return super().write(text)
+
+
+def test_read_targets_skips_comments_dedupes_and_lowercases():
+    lines = ['# programs\n', 'Example.COM\n', '\n', 'other.com  # note\n', 'example.com\n', '  \n']
+    assert list(read_targets(lines)) == ['example.com', 'other.com']
+
+
+def test_scan_target_record_shapes_and_order():
+    out = io.StringIO()
+    scan_target(StubSubARG(), 'example.com', JSONLWriter(out), report=True)
+
+    assert records(out) == [
+        {'type': 'host', 'target': 'example.com', 'host': 'a.example.com', 'source': 'subfinder'},
+        {'type': 'host', 'target': 'example.com', 'host': 'b.example.com', 'source': 'subfinder'},
+        {'type': 'host', 'target': 'example.com', 'host': 'c.example.com', 'source': 'crt.sh'},
+        {'type': 'resolution', 'target': 'example.com', 'host': 'a.example.com',
+         'record_type': 'A', 'ips': ['10.0.0.1']},
+        {'type': 'resolution', 'target': 'example.com', 'host': 'b.example.com',
+         'record_type': 'A', 'ips': ['10.0.0.1']},
+        {'type': 'resolution', 'target': 'example.com', 'host': 'c.example.com',
+         'record_type': 'A', 'ips': ['10.0.0.1']},
+        {'type': 'probe', 'target': 'example.com', 'url': 'https://a.example.com',
+         'info': '[200] [Title]', 'source': 'httpx'},
+        {'type': 'done', 'target': 'example.com', 'hosts': 3, 'resolved': 3, 'live': 1,
+         'output_file': 'subdomains_example.com.txt'},
+    ]
+
+
+def test_scan_target_skips_disabled_stages():
+    out = io.StringIO()
+    scan_target(StubSubARG(), 'example.com', JSONLWriter(out), resolve=False, probe=False)
+
+    assert [record['type'] for record in records(out)] == ['host', 'host', 'host', 'done']
+
+
+@pytest.mark.parametrize('stage', ['crt.sh', 'resolve', 'probe', 'report'])
+def test_failing_stage_becomes_error_record(stage):
+    out = io.StringIO()
+    scan_target(StubSubARG(fail=[stage]), 'example.com', JSONLWriter(out), report=True)
+
+    output = records(out)
+    errors = [record for record in output if record['type'] == 'error']
+    assert [error['source'] for error in errors] == [stage]
+    assert output[-1]['type'] == 'done'
+
+
+def test_one_bad_target_does_not_end_the_batch():
+    class Flaky(StubSubARG):
+        def probe_http(self, subdomains, resolved):
+            if any(host.endswith('bad.com') for host in subdomains):
+                raise ValueError('boom')
+            return super().probe_http(subdomains, resolved)
+
+    for concurrency in (1, 3):
+        out = io.StringIO()
+        run_targets(Flaky(), ['good.com', 'bad.com', 'fine.com'], JSONLWriter(out), concurrency)
+        done = sorted(record['target'] for record in records(out) if record['type'] == 'done')
+        assert done == ['bad.com', 'fine.com', 'good.com']
+
+
+@pytest.mark.parametrize('concurrency', [1, 4])
+def test_closed_output_stops_remaining_targets(concurrency):
+    stub = StubSubARG(delay=0.01)
+    writer = JSONLWriter(ClosingStream(limit=1))
+    targets = [f't{i}.com' for i in range(20)]
+
+    with pytest.raises(BrokenPipeError):
+        run_targets(stub, iter(targets), writer, concurrency)
+
+    assert writer.closed.is_set()
+    assert len(stub.scanned) <= 2 * concurrency
+
+
+def test_main_streams_records_and_exits_cleanly_on_closed_pipe(tmp_path, monkeypatch):
+    targets = tmp_path / 'targets.txt'
+    targets.write_text('\n'.join(f't{i}.com' for i in range(20)))
+    stub = StubSubARG(delay=0.01)
+    monkeypatch.setattr(subarg_module, 'SubARG', lambda: stub)
+    monkeypatch.setattr(cli.sys, 'stdout', ClosingStream(limit=1))
+
+    assert cli.main([str(targets), '-c', '4']) == 0
+    assert len(stub.scanned) <= 8
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+from app.jobqueue import SQLiteJobQueue, ENUMERATE, FINALIZE
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / 'queue.db'))
+
+
+def drain_enumerate(queue, count, worker_id='w1', results=None):
+    """Claim then complete ``count`` enumerate jobs, returning the finalize ids created"""
+    jobs = [queue.claim(worker_id) for _ in range(count)]
+    assert all(job['stage'] == ENUMERATE for job in jobs)
+
+    finalize_ids = []
+    for job in jobs:
+        finalize_id = queue.complete(job, (results or {}).get(job['tool'], []))
+        if finalize_id is not None:
+            finalize_ids.append(finalize_id)
+    return finalize_ids
+
+
+def test_claim_complete_queues_finalize_once(queue):
+    assert queue.submit_scan('s1', ['a.com'], {'output_format': 'json'}, tools=['x', 'y']) == 2
+
+    finalize_ids = drain_enumerate(queue, 2, results={'x': ['x.a.com'], 'y': ['y.a.com', 'x.a.com']})
+    assert len(finalize_ids) == 1
+
+    job = queue.claim('w2')
+    assert job['stage'] == FINALIZE
+    assert job['payload'] == {'subdomains': ['x.a.com', 'y.a.com']}
+    assert queue.scan_options('s1') == {'output_format': 'json'}
+
+    assert queue.complete(job, {'output_file': 'a.json', 'total': 2}) is None
+    assert queue.claim('w2') is None
+    assert queue.finalize_results('s1') == [{'output_file': 'a.json', 'total': 2}]
+
+
+def test_finalize_jobs_are_claimed_first(queue):
+    queue.submit_scan('s1', ['a.com'], tools=['x'])
+    queue.submit_scan('s2', ['b.com'], tools=['x'])
+
+    job = queue.claim('w1')
+    queue.complete(job, [])
+
+    assert queue.claim('w1')['stage'] == FINALIZE
+
+
+def test_failed_enumerate_job_still_finalizes_target(queue):
+    queue.submit_scan('s1', ['a.com'], tools=['x', 'y'])
+
+    first = queue.claim('w1')
+    second = queue.claim('w1')
+    assert queue.complete(first, ['ok.a.com']) is None
+    assert queue.fail(second, 'boom') is not None
+
+    job = queue.claim('w1')
+    assert job['stage'] == FINALIZE
+    assert job['payload']['subdomains'] == ['ok.a.com']
+
+
+def test_failed_finalize_job_is_marked_failed(queue):
+    queue.submit_scan('s1', ['a.com'], tools=['x'])
+    drain_enumerate(queue, 1)
+
+    job = queue.claim('w1')
+    queue.fail(job, 'boom')
+
+    progress = queue.scan_progress('s1')
+    assert progress['failed'] == 1
+    assert progress['queued'] == progress['running'] == 0
+    assert queue.finalize_results('s1') == []
+
+
+def test_stale_job_is_requeued_and_old_owner_is_ignored(queue):
+    queue.submit_scan('s1', ['a.com'], tools=['x'])
+
+    lost = queue.claim('w1')
+    time.sleep(0.05)
+    assert queue.requeue_stale(0.01) == 1
+
+    retry = queue.claim('w2')
+    assert retry['id'] == lost['id']
+
+    # The original worker finishing late must not clobber the new run
+    assert queue.touch(lost) is False
+    assert queue.complete(lost, ['old.a.com']) is None
+    assert queue.touch(retry) is True
+    assert queue.complete(retry, ['new.a.com']) is not None
+
+    assert queue.claim('w2')['payload']['subdomains'] == ['new.a.com']
+
+
+def test_heartbeat_keeps_job_from_being_requeued(queue):
+    queue.submit_scan('s1', ['a.com'], tools=['x'])
+
+    job = queue.claim('w1')
+    time.sleep(0.05)
+    assert queue.touch(job) is True
+    assert queue.requeue_stale(0.04) == 0
+
+
+def test_events_are_popped_in_order(queue):
+    queue.push_events('s1', [('new_result', {'subdomain': 'a.a.com'}),
+                             ('scan_update', {'current_tool': 'x'})])
+
+    events = queue.pop_events()
+    assert [event['event'] for event in events] == ['new_result', 'scan_update']
+    assert queue.pop_events() == []
@@ -0,0 +1,166 @@
+import os
+import gzip
+
+import pytest
+
+from app.results_index import ResultsIndex, write_meta, CACHE_DIR
+
+
+def make_report(directory, name, content='x', mtime=None, meta=None):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    if meta is not None:
+        write_meta(path, meta)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def results_dir(tmp_path):
+    return str(tmp_path)
+
+
+def test_listing_is_newest_first_and_paginated(results_dir):
+    for i in range(5):
+        make_report(results_dir, f'r{i}.txt', mtime=1000 + i, meta={'domain': f'd{i}.com', 'total_subdomains': i})
+    index = ResultsIndex(results_dir)
+
+    page, total = index.listing(1, 2)
+    assert total == 5
+    assert [entry['filename'] for entry in page] == ['r4.txt', 'r3.txt']
+    assert page[0]['target'] == 'd4.com'
+    assert page[0]['total'] == 4
+
+    page, total = index.listing(3, 2)
+    assert total == 5
+    assert [entry['filename'] for entry in page] == ['r0.txt']
+
+    assert index.listing(4, 2) == ([], 5)
+
+
+def test_sidecars_cache_and_dotfiles_are_not_listed(results_dir):
+    make_report(results_dir, 'r.json', meta={'domain': 'a.com'})
+    make_report(results_dir, '.hidden.tmp')
+    os.makedirs(os.path.join(results_dir, CACHE_DIR))
+
+    page, total = ResultsIndex(results_dir).listing()
+    assert total == 1
+    assert page[0]['filename'] == 'r.json'
+
+
+def test_report_rewritten_in_place_is_picked_up(results_dir):
+    make_report(results_dir, 'a.txt', mtime=1000, meta={'domain': 'old.com'})
+    make_report(results_dir, 'b.txt', mtime=2000, meta={'domain': 'b.com'})
+    index = ResultsIndex(results_dir)
+    assert [entry['filename'] for entry in index.listing()[0]] == ['b.txt', 'a.txt']
+
+    # Rewrite without changing the directory mtime, as an external writer might
+    dir_mtime = os.stat(results_dir).st_mtime
+    path = make_report(results_dir, 'a.txt', content='xxxx')
+    with open(path + '.meta.json', 'w') as f:
+        f.write('{"domain": "new.com"}')
+    os.utime(results_dir, (dir_mtime, dir_mtime))
+
+    page, _ = index.listing()
+    assert [entry['filename'] for entry in page] == ['a.txt', 'b.txt']
+    assert page[0]['target'] == 'new.com'
+    assert page[0]['size'] == 4
+
+
+def test_deleted_report_is_dropped_from_page(results_dir):
+    make_report(results_dir, 'a.txt', mtime=1000)
+    make_report(results_dir, 'b.txt', mtime=2000)
+    index = ResultsIndex(results_dir)
+    assert index.listing()[1] == 2
+
+    dir_mtime = os.stat(results_dir).st_mtime
+    os.remove(os.path.join(results_dir, 'b.txt'))
+    os.utime(results_dir, (dir_mtime, dir_mtime))
+
+    page, total = index.listing()
+    assert [entry['filename'] for entry in page] == ['a.txt']
+    assert total == 1
+
+
+def test_gzip_path_rebuilds_when_source_is_newer(results_dir):
+    path = make_report(results_dir, 'r.txt', content='first', mtime=1000)
+    index = ResultsIndex(results_dir)
+
+    cached = index.gzip_path('r.txt')
+    with gzip.open(cached, 'rt') as f:
+        assert f.read() == 'first'
+
+    make_report(results_dir, 'r.txt', content='second')
+    os.utime(cached, (1000, 1000))
+    assert os.path.getmtime(path) > os.path.getmtime(cached)
+
+    assert index.gzip_path('r.txt') == cached
+    with gzip.open(cached, 'rt') as f:
+        assert f.read() == 'second'
+
+    assert index.gzip_path('missing.txt') is None
+
+
+def test_refresh_prunes_cache_of_deleted_reports(results_dir):
+    make_report(results_dir, 'keep.txt')
+    make_report(results_dir, 'gone.txt')
+    index = ResultsIndex(results_dir)
+    keep = index.gzip_path('keep.txt')
+    gone = index.gzip_path('gone.txt')
+
+    stale_tmp = os.path.join(results_dir, CACHE_DIR, 'old.tmp')
+    fresh_tmp = os.path.join(results_dir, CACHE_DIR, 'new.tmp')
+    for tmp in (stale_tmp, fresh_tmp):
+        open(tmp, 'w').close()
+    os.utime(stale_tmp, (1000, 1000))
+
+    os.remove(os.path.join(results_dir, 'gone.txt'))
+    index.refresh(force=True)
+
+    assert os.path.exists(keep)
+    assert not os.path.exists(gone)
+    assert not os.path.exists(stale_tmp)
+    assert os.path.exists(fresh_tmp)
+
+
+def test_store_report_writes_report_and_meta(results_dir):
+    index = ResultsIndex(results_dir)
+
+    assert index.store_report('r.json', '{}', {'domain': 'a.com', 'total_subdomains': 3}) == 'r.json'
+
+    page, total = index.listing()
+    assert total == 1
+    assert page[0]['target'] == 'a.com'
+    assert page[0]['total'] == 3
+
+
+def test_store_report_rejects_traversal_and_dotfiles(results_dir):
+    index = ResultsIndex(results_dir)
+
+    assert index.store_report('../evil.txt', 'x') is None
+    assert index.store_report('sub/r.txt', 'x') is None
+    assert index.store_report('.hidden', 'x') is None
+    assert index.store_report('r.txt.meta.json', 'x') is None
+    assert index.store_report('', 'x') is None
+    assert index.store_report(None, 'x') is None
+
+    assert os.listdir(results_dir) == []
+    assert not os.path.exists(os.path.join(os.path.dirname(results_dir), 'evil.txt'))
+
+
+def test_results_endpoint_reports_total_count(results_dir, monkeypatch):
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_socketio')
+    from app import create_app
+
+    for i in range(3):
+        make_report(results_dir, f'r{i}.txt', mtime=1000 + i)
+
+    app = create_app()
+    app.config['RESULTS_DIR'] = results_dir
+    response = app.test_client().get('/api/results?page=1&per_page=2')
+
+    assert response.headers['X-Total-Count'] == '3'
+    assert [entry['filename'] for entry in response.get_json()] == ['r2.txt', 'r1.txt']
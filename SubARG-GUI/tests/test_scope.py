@@ -0,0 +1,144 @@
+import os
+
+from app.scope import Scope, load_scope
+from app.subarg import parse_dnsx_line
+
+
+def test_exclusion_wins_over_inclusion():
+    scope = Scope(include=['*.example.com'], exclude=['*.internal.example.com'])
+
+    assert scope.host_in_scope('www.example.com')
+    assert not scope.host_in_scope('db.internal.example.com')
+    assert not scope.host_in_scope('a.b.internal.example.com')
+    # the wildcard exclusion does not cover its own apex
+    assert scope.host_in_scope('internal.example.com')
+
+
+def test_wildcard_does_not_match_apex():
+    scope = Scope(include=['*.example.com'])
+
+    assert scope.host_in_scope('a.example.com')
+    assert scope.host_in_scope('a.b.example.com')
+    assert not scope.host_in_scope('example.com')
+    assert not scope.host_in_scope('notexample.com')
+
+
+def test_exact_entries_match_only_that_host():
+    scope = Scope(include=['api.example.com'])
+
+    assert scope.host_in_scope('api.example.com')
+    assert not scope.host_in_scope('v2.api.example.com')
+    assert not scope.host_in_scope('example.com')
+
+
+def test_empty_include_side_allows_everything_not_excluded():
+    scope = Scope(exclude=['legacy.example.com'])
+
+    assert scope.host_in_scope('anything.test')
+    assert not scope.host_in_scope('legacy.example.com')
+
+
+def test_from_lines_prefixes_and_comments():
+    scope = Scope.from_lines([
+        '# program scope',
+        '*.example.com',
+        '',
+        '!*.dev.example.com',
+        '-staging.example.com   # retired',
+        'api.other.com  # exact host',
+    ])
+
+    assert scope.host_in_scope('www.example.com')
+    assert not scope.host_in_scope('x.dev.example.com')
+    assert not scope.host_in_scope('staging.example.com')
+    assert scope.host_in_scope('api.other.com')
+    assert not scope.host_in_scope('program')
+
+
+def test_urls_and_ports_are_normalised():
+    scope = Scope.from_lines(['https://*.Example.com/path', 'api.other.com:8443'])
+
+    assert scope.host_in_scope('WWW.example.com.')
+    assert scope.host_in_scope('https://a.example.com:443/login')
+    assert scope.host_in_scope('api.other.com')
+    assert scope.host_in_scope('api.other.com:80')
+
+
+def test_ipv4_cidr_include_and_exclude():
+    scope = Scope.from_lines(['10.0.0.0/8', '192.0.2.7', '!10.1.0.0/16'])
+
+    assert scope.ip_in_scope('10.2.3.4')
+    assert scope.ip_in_scope('192.0.2.7')
+    assert not scope.ip_in_scope('192.0.2.8')
+    assert not scope.ip_in_scope('10.1.2.3')
+    assert not scope.ip_in_scope('8.8.8.8')
+    assert not scope.ip_in_scope('not-an-ip')
+
+
+def test_ipv6_cidr_include_and_exclude():
+    scope = Scope.from_lines(['2001:db8::/32', '!2001:db8:dead::/48'])
+
+    assert scope.ip_in_scope('2001:db8:1::1')
+    assert not scope.ip_in_scope('2001:db8:dead::1')
+    assert not scope.ip_in_scope('2001:db9::1')
+    # v4 and v6 tables are separate
+    assert not scope.ip_in_scope('10.0.0.1')
+
+
+def test_record_in_scope_without_cidr_rules_ignores_addresses():
+    scope = Scope.from_lines(['*.example.com'])
+
+    assert not scope.has_ip_rules
+    assert scope.record_in_scope('a.example.com', ['8.8.8.8'])
+    assert scope.record_in_scope('a.example.com', [])
+    assert not scope.record_in_scope('a.other.com', ['8.8.8.8'])
+
+
+def test_record_in_scope_with_cidr_rules_checks_every_address():
+    scope = Scope.from_lines(['*.example.com', '10.0.0.0/8'])
+
+    assert scope.has_ip_rules
+    assert scope.record_in_scope('a.example.com', ['10.0.0.1'])
+    assert not scope.record_in_scope('a.example.com', ['10.0.0.1', '8.8.8.8'])
+    assert not scope.record_in_scope('a.other.com', ['10.0.0.1'])
+
+
+def test_empty_scope_is_falsy():
+    assert not Scope()
+    assert not Scope.from_lines(['# only comments', ''])
+    assert Scope(include=['*.example.com'])
+
+
+def test_parse_dnsx_line_with_record_type():
+    assert parse_dnsx_line('a.example.com [A] [1.2.3.4]') == ('a.example.com', 'A', ['1.2.3.4'])
+    assert parse_dnsx_line('a.example.com [AAAA] [2001:db8::1]') == ('a.example.com', 'AAAA', ['2001:db8::1'])
+
+
+def test_parse_dnsx_line_without_record_type():
+    assert parse_dnsx_line('a.example.com [1.2.3.4]') == ('a.example.com', None, ['1.2.3.4'])
+
+
+def test_parse_dnsx_line_cname_has_no_addresses():
+    assert parse_dnsx_line('a.example.com [CNAME] [a.cdn.example.net]') == ('a.example.com', 'CNAME', [])
+
+
+def test_parse_dnsx_line_blank():
+    assert parse_dnsx_line('   ') == (None, None, [])
+
+
+def test_load_scope_reloads_when_mtime_changes(tmp_path):
+    path = tmp_path / 'scope.txt'
+    path.write_text('*.example.com\n')
+
+    first = load_scope(str(path))
+    assert load_scope(str(path)) is first
+    assert first.host_in_scope('a.example.com')
+
+    path.write_text('*.other.com\n')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    second = load_scope(str(path))
+    assert second is not first
+    assert second.host_in_scope('a.other.com')
+    assert not second.host_in_scope('a.example.com')
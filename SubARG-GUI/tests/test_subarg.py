@@ -0,0 +1,88 @@
+import subprocess
+
+from app.subarg import SubARG
+from app.scope import Scope
+
+
+class FakeCompleted:
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+
+def make_subarg(tmp_path, monkeypatch, dnsx_output, tool_paths):
+    subarg = SubARG()
+    subarg._tool_paths = tool_paths
+    subarg.results_dir = str(tmp_path)
+
+    probed = []
+
+    def fake_run(cmd, **kwargs):
+        if cmd[0] == 'dnsx':
+            return FakeCompleted(dnsx_output)
+        return FakeCompleted('')
+
+    def fake_httprobe(self, targets):
+        probed.extend(targets)
+        return [f'http://{target}' for target in targets]
+
+    monkeypatch.setattr(subprocess, 'run', fake_run)
+    monkeypatch.setattr(SubARG, 'run_httprobe', fake_httprobe)
+    return subarg, probed
+
+
+def test_cidr_scope_never_probes_hosts_outside_ranges(tmp_path, monkeypatch):
+    subarg, probed = make_subarg(
+        tmp_path, monkeypatch,
+        'a.example.com [A] [8.8.8.8]\nc.example.com [A] [10.1.1.1]\n',
+        {'dnsx': 'dnsx', 'httpx': None, 'httprobe': 'httprobe'}
+    )
+    subarg.set_scope(Scope.from_lines(['*.example.com', '10.0.0.0/8']))
+
+    results = subarg.finalize('example.com', ['a.example.com', 'b.example.com', 'c.example.com'])
+
+    assert probed == ['c.example.com']
+    assert results['resolved'] == ['c.example.com [A] [10.1.1.1]']
+    assert results['live'] == ['http://c.example.com']
+    assert results['subdomains'] == ['c.example.com']
+
+
+def test_cidr_scope_with_nothing_in_range_probes_nothing(tmp_path, monkeypatch):
+    subarg, probed = make_subarg(
+        tmp_path, monkeypatch,
+        'a.example.com [A] [8.8.8.8]\n',
+        {'dnsx': 'dnsx', 'httpx': None, 'httprobe': 'httprobe'}
+    )
+    subarg.set_scope(Scope.from_lines(['*.example.com', '10.0.0.0/8']))
+
+    results = subarg.finalize('example.com', ['a.example.com', 'b.example.com'])
+
+    assert probed == []
+    assert results['live'] == []
+    assert results['total'] == 0
+
+
+def test_host_with_one_excluded_address_is_dropped(tmp_path, monkeypatch):
+    subarg, probed = make_subarg(
+        tmp_path, monkeypatch,
+        'a.example.com [A] [10.1.1.1]\na.example.com [A] [10.9.9.9]\n',
+        {'dnsx': 'dnsx', 'httpx': None, 'httprobe': 'httprobe'}
+    )
+    subarg.set_scope(Scope.from_lines(['*.example.com', '!10.9.0.0/16']))
+
+    results = subarg.finalize('example.com', ['a.example.com'])
+
+    assert probed == []
+    assert results['resolved'] == []
+
+
+def test_name_only_scope_still_probes_unresolved_names(tmp_path, monkeypatch):
+    subarg, probed = make_subarg(
+        tmp_path, monkeypatch, '',
+        {'dnsx': None, 'httpx': None, 'httprobe': 'httprobe'}
+    )
+    subarg.set_scope(Scope.from_lines(['*.example.com', '!*.dev.example.com']))
+
+    results = subarg.finalize('example.com', ['a.example.com', 'x.dev.example.com'])
+
+    assert probed == ['a.example.com']
+    assert results['live'] == ['http://a.example.com']
@@ -0,0 +1,141 @@
+import os
+import json
+
+import pytest
+
+import app.worker as worker_module
+from app.jobqueue import SQLiteJobQueue, ENUMERATE, FINALIZE
+from app.results_index import ResultsIndex, write_meta
+from app.worker import Worker
+
+
+class StubSubARG:
+    """Stands in for SubARG: canned tool output, real report files"""
+
+    tool_output = {
+        'x': ['a.example.com', 'b.example.com', 'a.example.com'],
+        'y': ['c.example.com'],
+    }
+
+    def __init__(self):
+        self.results_dir = None
+        self.scope = None
+        self.output_format = 'txt'
+        self.output_file = None
+        self.finalized = []
+
+    def set_scope(self, scope):
+        self.scope = scope
+
+    def set_output_format(self, format):
+        self.output_format = format
+
+    def set_output_file(self, filename):
+        self.output_file = filename
+
+    def run_tool(self, tool, target):
+        results = self.tool_output.get(tool, [])
+        if self.scope:
+            results = self.scope.filter_hosts(results)
+        return results
+
+    def finalize(self, target, subdomains):
+        self.finalized.append((target, list(subdomains)))
+        filename = f"{self.output_file or target}.{self.output_format}"
+        path = os.path.join(self.results_dir, filename)
+        with open(path, 'w') as f:
+            f.write('\n'.join(subdomains))
+        write_meta(path, {'domain': target, 'total_subdomains': len(subdomains)})
+        return {'output_file': filename, 'total': len(subdomains)}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / 'queue.db'))
+
+
+@pytest.fixture
+def worker(tmp_path, queue, monkeypatch):
+    monkeypatch.setattr(worker_module, 'SubARG', StubSubARG)
+    return Worker(queue, worker_id='w1', results_dir=str(tmp_path / 'worker-results'))
+
+
+def test_enumerate_job_stores_results_and_pushes_events(queue, worker):
+    queue.submit_scan('s1', ['example.com'], {'scope': '*.example.com\n!b.example.com'}, tools=['x'])
+
+    job = queue.claim(worker.worker_id)
+    assert job['stage'] == ENUMERATE
+    worker._run_job(job)
+
+    events = queue.pop_events()
+    assert events[0]['event'] == 'scan_update'
+    assert [event['data']['subdomain'] for event in events[1:]] == ['a.example.com']
+    assert all(event['data']['tool'] == 'x' for event in events[1:])
+
+    finalize = queue.claim(worker.worker_id)
+    assert finalize['stage'] == FINALIZE
+    assert finalize['payload'] == {'subdomains': ['a.example.com']}
+
+
+def test_finalize_job_sends_report_back_to_web_results_dir(tmp_path, queue, worker):
+    queue.submit_scan('s1', ['example.com'], {'output_format': 'json', 'filename': 'run'},
+                      tools=['x', 'y'])
+
+    while True:
+        job = queue.claim(worker.worker_id)
+        if job is None:
+            break
+        worker._run_job(job)
+
+    assert worker.subarg.finalized == [
+        ('example.com', ['a.example.com', 'b.example.com', 'c.example.com'])
+    ]
+    assert worker.subarg.output_format == 'json'
+
+    [report] = queue.finalize_results('s1')
+    assert report['output_file'] == 'run.json'
+    assert report['report'] == 'a.example.com\nb.example.com\nc.example.com'
+    assert report['meta'] == {'domain': 'example.com', 'total_subdomains': 3}
+
+    # What the web app's relay does with the result, in a separate directory
+    web_dir = tmp_path / 'web-results'
+    web_dir.mkdir()
+    index = ResultsIndex(str(web_dir))
+    stored = index.store_report(report['output_file'], report['report'], report['meta'])
+
+    assert stored == 'run.json'
+    assert (web_dir / 'run.json').read_text() == report['report']
+    assert json.loads((web_dir / 'run.json.meta.json').read_text())['domain'] == 'example.com'
+    page, total = index.listing()
+    assert total == 1
+    assert page[0]['target'] == 'example.com'
+    assert page[0]['total'] == 3
+
+
+def test_multiple_targets_get_separate_report_names(queue, worker):
+    queue.submit_scan('s1', ['a.com', 'b.com'], {'filename': 'run', 'multiple_targets': True},
+                      tools=['y'])
+
+    while True:
+        job = queue.claim(worker.worker_id)
+        if job is None:
+            break
+        worker._run_job(job)
+
+    files = sorted(report['output_file'] for report in queue.finalize_results('s1'))
+    assert files == ['run_a.com.txt', 'run_b.com.txt']
+
+
+def test_failing_finalize_marks_job_failed(queue, worker, monkeypatch):
+    def broken_finalize(target, subdomains):
+        raise OSError('disk full')
+
+    queue.submit_scan('s1', ['example.com'], tools=['y'])
+    worker._run_job(queue.claim(worker.worker_id))
+
+    monkeypatch.setattr(worker.subarg, 'finalize', broken_finalize)
+    worker._run_job(queue.claim(worker.worker_id))
+
+    progress = queue.scan_progress('s1')
+    assert progress['failed'] == 1
+    assert queue.finalize_results('s1') == []
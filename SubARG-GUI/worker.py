@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+SubARG GUI - Headless Scan Worker
+
+Pulls scan jobs queued by the web app (started with SUBARG_QUEUE pointing at
+the same file) and runs them. Start as many as needed, on any host that
+shares the queue file; finished reports are sent back through the queue.
+"""
+
+import os
+import argparse
+
+from app.jobqueue import SQLiteJobQueue
+from app.worker import Worker
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SubARG scan worker')
+    parser.add_argument('--queue', default=os.environ.get('SUBARG_QUEUE'),
+                        help='Path of the shared SQLite queue file (default: $SUBARG_QUEUE)')
+    parser.add_argument('--results-dir', default=os.environ.get('SUBARG_RESULTS_DIR'),
+                        help='Local directory for reports before they are sent back (default: app/results)')
+    parser.add_argument('--worker-id', help='Name reported with progress events')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds to wait when the queue is empty')
+    args = parser.parse_args()
+
+    if not args.queue:
+        parser.error('--queue or SUBARG_QUEUE is required')
+
+    worker = Worker(SQLiteJobQueue(args.queue), worker_id=args.worker_id,
+                    results_dir=args.results_dir, poll_interval=args.poll_interval)
+    worker.run_forever()